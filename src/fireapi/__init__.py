@@ -16,13 +16,24 @@ Usage:
    {'status': 'success', 'requestID': '....
    >>> datacenter = config["data"]["hostsystem"]["datacenter"]["name"]
    >>> processor = config["data"]["hostsystem"]["processor"]
+   >>> # Release the pooled connections when done, or use a with block
+   >>> with FireAPI(API_KEY) as fire_api:
+   ...     status = fire_api.get_status()
    >>> # Retrieve server configuration asynchronously
-   >>> config = await async_fire_api.get_config()
+   >>> async with AsyncFireAPI(API_KEY) as async_fire_api:
+   ...     config = await async_fire_api.get_config()
+   ...     # Fetch several endpoints concurrently instead of awaiting them one by one
+   ...     snapshot = await async_fire_api.snapshot(include=("config", "status"))
    >>> print(config)
    {'status': 'success', 'requestID': '....
    >>> datacenter = config["data"]["hostsystem"]["datacenter"]["name"]
    >>> processor = config["data"]["hostsystem"]["processor'}
+   >>> status = snapshot["status"]["data"]["status"]
 """
 
-from .api import AsyncFireAPI, FireAPI
+import logging
+
+from .api import AsyncFireAPI, Batcher, FireAPI
 from .exceptions import APIAuthenticationError, APIRequestError, FireAPIError
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -1,82 +1,1344 @@
+import asyncio
+import json
 import logging
-from typing import Dict
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from itertools import takewhile
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from yarl import URL
 
-from .base import BaseFireAPI
-from .exceptions import APIAuthenticationError, APIRequestError, FireAPIError
+from .base import BaseFireAPI, _copy_json
+from .exceptions import FireAPIError
+
+__all__ = ["FireAPI", "AsyncFireAPI", "Batcher"]
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional, installed with the "fast" extra
+    orjson = None
+
+try:
+    import httpx
+except ImportError:  # optional, installed with the "http2" extra
+    httpx = None
+
+try:
+    import ijson
+except ImportError:  # optional, installed with the "stream" extra
+    ijson = None
+
+# Decodes a raw response body; orjson is several times faster than json.
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _encode_body(data: Union[Dict, bytes, None]) -> Optional[bytes]:
+    """
+    Serializes a request payload to JSON bytes, or returns None for no body.
+
+    Bytes are taken to be JSON serialized by the caller and sent as they are,
+    so a payload reused across calls only has to be encoded once.
+    """
+    if data is None or isinstance(data, bytes):
+        return data
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+
+# Transport errors the clients turn into FireAPIError, for either backend.
+# aiohttp reports its total timeout as a plain asyncio.TimeoutError.
+_HTTPX_ERRORS = (httpx.HTTPError,) if httpx is not None else ()
+_SYNC_CLIENT_ERRORS = (requests.RequestException,) + _HTTPX_ERRORS
+_ASYNC_CLIENT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError) + _HTTPX_ERRORS
+
+# Network errors that may succeed on a retry, as opposed to e.g. invalid URLs.
+_HTTPX_TRANSIENT_ERRORS = (httpx.TransportError,) if httpx is not None else ()
+_ASYNC_TRANSIENT_ERRORS = (
+    aiohttp.ClientConnectionError,
+    asyncio.TimeoutError,
+) + _HTTPX_TRANSIENT_ERRORS
+
+
+# Marks the threads of FireAPI's thread pools.
+_pool_thread = threading.local()
+
+
+def _mark_pool_thread() -> None:
+    _pool_thread.active = True
+
+
+class _ItemParser:
+    """Incrementally parses the values at an ijson prefix out of body chunks."""
+
+    def __init__(self, prefix: str):
+        if ijson is None:
+            raise ImportError("Streaming requires ijson: pip install 'fireapi[stream]'")
+        self._items = ijson.sendable_list()
+        self._coro = ijson.items_coro(self._items, prefix, use_float=True)
+
+    def feed(self, chunk: bytes) -> List:
+        """Parses the next chunk and returns the values it completed."""
+        self._coro.send(chunk)
+        return self._drain()
+
+    def close(self) -> List:
+        """Finishes parsing and returns the remaining values."""
+        self._coro.close()
+        return self._drain()
+
+    def _drain(self) -> List:
+        items = list(self._items)
+        del self._items[:]
+        return items
+
+
+class _CappedRetry(Retry):
+    """
+    A urllib3 Retry with the backoff of ``BaseFireAPI._retry_delay``.
+
+    urllib3 retries the first failure immediately; this one waits
+    ``backoff_factor`` seconds and doubles the wait from there, and it waits
+    at most ``max_retry_after`` seconds for a Retry-After header.
+    """
+
+    def __init__(self, *args, max_retry_after: Optional[float] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kwargs) -> "_CappedRetry":
+        kwargs.setdefault("max_retry_after", self.max_retry_after)
+        return super().new(**kwargs)
+
+    def get_backoff_time(self) -> float:
+        # Only the latest run of errors counts, as in urllib3; redirects don't.
+        errors = len(
+            list(
+                takewhile(lambda x: x.redirect_location is None, reversed(self.history))
+            )
+        )
+        if not errors:
+            return 0.0
+        backoff = min(self.backoff_max, self.backoff_factor * 2 ** (errors - 1))
+        return backoff + random.uniform(0, self.backoff_jitter)
+
+    def get_retry_after(self, response) -> Optional[float]:
+        seconds = super().get_retry_after(response)
+        if seconds is not None and self.max_retry_after is not None:
+            seconds = min(seconds, self.max_retry_after)
+        return seconds
+
+
+class _ConcurrencyLimiter:
+    """
+    Caps the number of requests in flight, optionally adapting the cap.
+
+    With a ``max_limit`` the cap follows additive-increase /
+    multiplicative-decrease: it halves whenever a request is throttled or
+    fails, or when the average latency of a full window of requests exceeds
+    ``latency_target``, and grows by one after each healthy window, up to
+    ``max_limit``. Failures of requests started before the last cut belong to
+    the same congestion event and don't cut it again. Without a
+    ``max_limit`` the cap stays fixed, like a semaphore.
+    """
+
+    __slots__ = (
+        "limit",
+        "max_limit",
+        "latency_target",
+        "_active",
+        "_waiters",
+        "_latencies",
+        "_decreased_at",
+    )
+
+    # Requests per window after which a healthy limiter raises its cap.
+    WINDOW = 32
+
+    def __init__(
+        self,
+        limit: int,
+        max_limit: Optional[int] = None,
+        latency_target: Optional[float] = None,
+    ):
+        self.limit = limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._latencies: Deque[float] = deque(maxlen=self.WINDOW)
+        self._decreased_at = float("-inf")
+
+    async def acquire(self) -> None:
+        """Waits for a free slot and takes it."""
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation.
+                self._active -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(
+        self,
+        latency: Optional[float] = None,
+        failed: bool = False,
+        started: Optional[float] = None,
+    ) -> None:
+        """
+        Frees a slot and records how the request went.
+
+        ``latency`` is the duration of a healthy request; ``failed`` marks a
+        request that was throttled or failed transiently, and ``started`` is
+        its ``time.monotonic()`` start. A request with neither, e.g. a
+        cancelled one, is not taken into account.
+        """
+        self._active -= 1
+        if self.max_limit is not None:
+            if failed:
+                if started is None or started > self._decreased_at:
+                    self._decrease()
+            elif latency is not None:
+                self._latencies.append(latency)
+                if len(self._latencies) == self.WINDOW:
+                    average = sum(self._latencies) / self.WINDOW
+                    if self.latency_target and average > self.latency_target:
+                        self._decrease()
+                    else:
+                        self.limit = min(self.max_limit, self.limit + 1)
+                        self._latencies.clear()
+        self._wake()
+
+    def _decrease(self) -> None:
+        """Halves the cap and starts a new window."""
+        self.limit = max(1, self.limit // 2)
+        self._latencies.clear()
+        self._decreased_at = time.monotonic()
+
+    def _wake(self) -> None:
+        """Hands free slots to the longest-waiting callers."""
+        while self._waiters and self._active < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(None)
 
 
 class FireAPI(BaseFireAPI):
-    """Synchronous API wrapper for the 24Fire REST API."""
+    """
+    Synchronous API wrapper for the 24Fire REST API.
+
+    ``pool_connections`` and ``pool_maxsize`` size the keep-alive pool of the
+    underlying requests session; raise ``pool_maxsize`` when many threads
+    share one client. ``max_workers`` is the number of threads
+    ``request_many`` uses.
+
+    Requests go through requests by default. With ``backend="httpx"`` they use
+    an HTTP/2 ``httpx.Client`` instead, which multiplexes the concurrent
+    requests of ``request_many`` over a single connection (requires the
+    "http2" extra). ``pool_maxsize`` then caps its number of connections.
+
+    The session or client is created on first use, so a client that never
+    sends a request doesn't set up a connection pool.
+    """
+
+    __slots__ = (
+        "max_workers",
+        "backend",
+        "pool_connections",
+        "pool_maxsize",
+        "_session",
+        "_client",
+        "_client_lock",
+        "_executor",
+        "_inflight",
+        "_inflight_lock",
+    )
+
+    BACKENDS = ("requests", "httpx")
+
+    def __init__(
+        self,
+        api_key: str,
+        timeout: int = 5,
+        cache_ttl: Optional[Dict[str, float]] = None,
+        cache_dir: Optional[str] = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 50,
+        max_workers: int = 8,
+        backend: str = "requests",
+        max_retries: int = 3,
+        backoff_base: float = 0.3,
+        max_backoff: float = 8.0,
+        stale_on_error: bool = False,
+    ):
+        super().__init__(
+            api_key,
+            timeout,
+            cache_ttl,
+            cache_dir,
+            max_retries,
+            backoff_base,
+            max_backoff,
+            stale_on_error,
+        )
+        if backend not in self.BACKENDS:
+            raise ValueError(
+                f"Unknown backend {backend!r}, expected one of {self.BACKENDS}"
+            )
+        if backend == "httpx" and httpx is None:
+            raise ImportError(
+                "The httpx backend requires httpx: pip install 'fireapi[http2]'"
+            )
+        self.max_workers = max_workers
+        self.backend = backend
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._client: Optional["httpx.Client"] = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def session(self) -> Optional[requests.Session]:
+        """
+        The requests session of the default backend, or None with httpx.
+
+        An assigned session is used for all further requests and is closed by
+        ``close()`` like the client's own.
+        """
+        if self.backend != "requests":
+            return None
+        return self._get_session()
+
+    @session.setter
+    def session(self, session: Optional[requests.Session]) -> None:
+        if self.backend != "requests":
+            raise ValueError(
+                f"The {self.backend} backend doesn't use a requests session"
+            )
+        self._session = session
+
+    def _get_session(self) -> requests.Session:
+        """
+        Returns the shared requests session, creating it on first use.
+
+        The lock keeps the threads of ``request_many`` from each building
+        their own session when they all start with the first request.
+        """
+        if self._session is None:
+            with self._client_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.headers.update(self.headers)
+
+                    # Retry transient failures of idempotent requests and keep
+                    # a larger keep-alive pool so concurrent threads don't open
+                    # extra sockets.
+                    retry = _CappedRetry(
+                        total=self.max_retries,
+                        backoff_factor=self.backoff_base,
+                        backoff_max=self.max_backoff,
+                        backoff_jitter=self._RETRY_JITTER,
+                        status_forcelist=self._RETRY_STATUSES,
+                        allowed_methods=self._RETRY_METHODS,
+                        # Hand the last failed response to _check_status, as
+                        # the other backends do, instead of raising RetryError.
+                        raise_on_status=False,
+                        max_retry_after=self._server_wait_cap(),
+                    )
+                    adapter = HTTPAdapter(
+                        pool_connections=self.pool_connections,
+                        pool_maxsize=self.pool_maxsize,
+                        max_retries=retry,
+                    )
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def _get_client(self) -> "httpx.Client":
+        """Returns the shared HTTP/2 client of the httpx backend, creating it on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        headers=self.headers,
+                        http2=True,
+                        timeout=self.timeout,
+                        limits=httpx.Limits(max_connections=self.pool_maxsize),
+                    )
+        return self._client
+
+    def __enter__(self) -> "FireAPI":
+        return self
 
-    def __init__(self, api_key: str, timeout: int = 5):
-        super().__init__(api_key, timeout)
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
-    def _request(self, endpoint: str, method: str = "GET", data: Dict = None) -> Dict:
+    def close(self) -> None:
+        """
+        Closes the underlying session and releases its pooled connections.
+
+        This includes a session assigned to ``session``.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        self._close_cache()
+
+    def snapshot(
+        self, *, include: Iterable[str] = ("config", "status")
+    ) -> Dict[str, Union[Dict, Exception]]:
+        """
+        Fetch several GET endpoints concurrently.
+
+        The requests run on the thread pool of ``request_many``, so the whole
+        snapshot takes about as long as the slowest single request.
+
+        Args:
+            include (Iterable[str], optional): The endpoints to fetch.
+                Defaults to ("config", "status").
+
+        Usage:
+            >>> snapshot = fire_api.snapshot(
+            ...     include=("config", "status", "backup/list")
+            ... )
+            >>> print(snapshot["status"]["data"]["status"])
+
+        Returns:
+            dict: The response of each endpoint, keyed by endpoint. A request
+            that failed maps to the exception it raised.
+        """
+        include = tuple(include)
+        results = self.request_many((endpoint,) for endpoint in include)
+        return dict(zip(include, results))
+
+    def wait_for_status(
+        self, target: str, interval: float = 1.0, timeout: float = 60.0
+    ) -> Dict:
+        """
+        Poll the server status until it reaches ``target``.
+
+        The status is requested every ``interval`` seconds over the pooled
+        connection, bypassing the cache. While the server is still booting the
+        response rarely changes, so a body identical to the previous one is
+        not parsed again. ``timeout`` bounds the polling; a poll already in
+        progress, including its retries, is finished first.
+
+        Args:
+            target (str): The status to wait for, e.g. "running".
+            interval (float, optional): Seconds between polls. Defaults to 1.0.
+            timeout (float, optional): Seconds to wait at most. Defaults to 60.0.
+
+        Usage:
+            >>> fire_api.start_server()
+            >>> status = fire_api.wait_for_status("running")
+
+        Returns:
+            dict: The first status response with the target status.
+
+        Raises:
+            FireAPIError: If the server doesn't reach ``target`` within
+            ``timeout`` seconds, a request fails, or a response has no
+            ``data.status``.
+        """
+        deadline = time.monotonic() + timeout
+        url = self._urls["status"]
+        previous = result = None
+        while True:
+            try:
+                generation = self._cache_generation("status")
+                status, headers, body = self._send("GET", url, None, None)
+                self._note_rate_limit(headers)
+                if status >= 400:
+                    self._check_status(status, body)
+                if body != previous:
+                    result = _json_loads(body)
+                    previous = body
+                current = self._status_of(result, body)
+
+            except (*_SYNC_CLIENT_ERRORS, ValueError) as e:
+                logger.error("Request failed: %s", e)
+                raise FireAPIError(f"API request failed: {e}") from e
+
+            if current == target:
+                self._update_cache(
+                    "status", "GET", result, headers=headers, generation=generation
+                )
+                return _copy_json(result)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise FireAPIError(
+                    f"Server did not reach status {target!r} within {timeout}s"
+                )
+            time.sleep(min(interval, remaining))
+
+    def request_many(self, calls: Iterable[Tuple]) -> List[Union[Dict, Exception]]:
+        """
+        Send several requests concurrently over the pooled session.
+
+        The requests run on a thread pool that shares the session's keep-alive
+        connections, so independent calls take about one round-trip in total.
+
+        Args:
+            calls (Iterable[Tuple]): ``(endpoint, method, data, params)``
+                tuples, as passed to ``_request``; all but the endpoint may be
+                left out.
+
+        Usage:
+            >>> config, status = fire_api.request_many([("config",), ("status",)])
+
+        Returns:
+            list: The response of each call, in order. A call that failed is
+            returned as the exception it raised.
+        """
+        return self._run_all(partial(self._request, *call) for call in calls)
+
+    def fetch_many(self, *calls: Callable[[], Dict]) -> List[Union[Dict, Exception]]:
+        """
+        Call several API methods concurrently.
+
+        Like ``request_many``, but takes the methods themselves, or any other
+        callables without arguments, so the endpoints don't have to be
+        spelled out.
+
+        Usage:
+            >>> config, status, backups = fire_api.fetch_many(
+            ...     fire_api.get_config, fire_api.get_status, fire_api.backup_list
+            ... )
+
+        Returns:
+            list: The result of each call, in order. A call that failed is
+            returned as the exception it raised.
+        """
+        return self._run_all(calls)
+
+    def _run_all(self, calls: Iterable[Callable[[], Any]]) -> List[Any]:
+        """
+        Runs callables on the thread pool and collects their results in order.
+
+        A batch started from a pool thread, e.g. ``fetch_many`` of a method
+        that calls ``request_many`` itself, runs inline instead: its callers
+        would otherwise hold the workers its own calls wait for.
+        """
+        if getattr(_pool_thread, "active", False):
+            results: List[Any] = []
+            for call in calls:
+                try:
+                    results.append(call())
+                except Exception as e:
+                    results.append(e)
+            return results
+
+        if self._executor is None:
+            with self._client_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, initializer=_mark_pool_thread
+                    )
+        futures = [self._executor.submit(call) for call in calls]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _request(
+        self,
+        endpoint: str,
+        method: str = "GET",
+        data: Union[Dict, bytes] = None,
+        params: Dict = None,
+        bypass_cache: bool = False,
+    ) -> Dict:
         """
         Makes an API request and handles potential errors.
+
+        Threads requesting the same GET endpoint at the same time share a
+        single network round-trip: later callers wait for the request already
+        in flight. Each caller of a GET gets its own copy of the response, so
+        modifying it doesn't change what the cache hands out.
+
         Args:
             endpoint (str): The API endpoint to send the request to.
             method (str, optional): The HTTP method to use for the request. Defaults to "GET".
-            data (Dict, optional): The data to send with the request, if any. Defaults to None.
+            data (Union[Dict, bytes], optional): The data to send with the request, if any, as a dict or as already serialized JSON bytes. Defaults to None.
+            params (Dict, optional): Query parameters to URL-encode into the request. Defaults to None.
+            bypass_cache (bool, optional): Send a GET even if a cached response is still fresh. Defaults to False.
         Returns:
             Dict: The JSON response from the API.
         Raises:
             APIAuthenticationError: If authentication fails or access is denied.
+            APIRequestError: If the API rejects the request with a 4xx status.
             FireAPIError: If the request fails for any other reason.
         """
+        if method != "GET" or params is not None or data is not None:
+            return self._fetch(endpoint, method, data, params)
+        if bypass_cache:
+            return _copy_json(self._fetch(endpoint, method))
+
+        cached = self._get_cached(endpoint)
+        if cached is not None:
+            return _copy_json(cached)
+
+        with self._inflight_lock:
+            future = self._inflight.get(endpoint)
+            if future is not None:
+                leader = False
+            else:
+                leader = True
+                future = self._inflight[endpoint] = Future()
+        if not leader:
+            return _copy_json(future.result())
+
+        try:
+            result = self._fetch_or_stale(endpoint)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return _copy_json(result)
+        finally:
+            with self._inflight_lock:
+                # An invalidation may have dropped or replaced the entry.
+                if self._inflight.get(endpoint) is future:
+                    del self._inflight[endpoint]
+
+    def _invalidate(self, endpoint: Optional[str]) -> None:
+        super()._invalidate(endpoint)
+        # Later callers send a new request instead of joining an outdated one.
+        with self._inflight_lock:
+            if endpoint is None:
+                self._inflight.clear()
+            else:
+                self._inflight.pop(endpoint, None)
+
+    def _fetch_or_stale(self, endpoint: str) -> Dict:
+        """GETs an endpoint, falling back to its expired cached response on failure."""
+        try:
+            return self._fetch(endpoint, "GET")
+        except FireAPIError as e:
+            stale = self._get_stale(endpoint, e)
+            if stale is None:
+                raise
+            return stale
+
+    def _fetch(
+        self,
+        endpoint: str,
+        method: str,
+        data: Union[Dict, bytes] = None,
+        params: Dict = None,
+    ) -> Dict:
+        """
+        Sends a request over the shared session and returns the JSON response.
+
+        A GET for an expired cached response that carried an ETag or a
+        Last-Modified date is sent as a conditional request; a 304 answer
+        reuses the cached response.
+        """
+        generation = self._cache_generation(endpoint)
+        validators, cached = self._get_revalidation(endpoint, method, params)
         try:
-            url = f"{self.base_url}/{endpoint}"
-            response = self.session.request(
-                method, url, json=data, timeout=self.timeout
+            url = self._urls.get(endpoint) or self._url_prefix + endpoint
+            status, headers, body = self._send(
+                method, url, _encode_body(data), params, validators
             )
+            self._note_rate_limit(headers)
+            if status == 304 and cached is not None:
+                self._refresh_cache(endpoint, cached, validators, generation)
+                return cached
+            if status >= 400:
+                self._check_status(status, body)
+            result = _json_loads(body)
 
-            if response.status_code == 401:
-                raise APIAuthenticationError(
-                    "Authentication failed. Check your API key."
-                )
-            elif response.status_code == 403:
-                raise APIAuthenticationError(
-                    "Access denied or this feature requires a '24fire+' subscription."
+        except (*_SYNC_CLIENT_ERRORS, ValueError) as e:
+            logger.error("Request failed: %s", e)
+            raise FireAPIError(f"API request failed: {e}") from e
+
+        self._update_cache(endpoint, method, result, params, headers, generation)
+        return result
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        params: Optional[Dict],
+        headers: Optional[Dict] = None,
+    ) -> Tuple[int, Any, bytes]:
+        """
+        Sends one request and returns its status, headers and raw body.
+
+        The requests session retries through its urllib3 Retry; the httpx
+        backend applies the same policy here.
+        """
+        delay = self._rate_limit_delay()
+        if delay:
+            logger.warning("Rate limit reached, waiting %.1fs", delay)
+            time.sleep(delay)
+        if self.backend == "requests":
+            response = self._get_session().request(
+                method,
+                url,
+                data=body,
+                params=params,
+                headers=headers,
+                timeout=self.timeout,
+            )
+            return response.status_code, response.headers, response.content
+
+        attempt = 0
+        while True:
+            try:
+                response = self._get_client().request(
+                    method, url, content=body, params=params, headers=headers
                 )
+            except _HTTPX_TRANSIENT_ERRORS as e:
+                if not self._should_retry(method, attempt):
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning("%r from %s, retrying in %.1fs", e, url, delay)
+            else:
+                status = response.status_code
+                if not self._should_retry(method, attempt, status):
+                    return status, response.headers, response.content
+                delay = self._retry_delay(attempt, response.headers.get("Retry-After"))
+                logger.warning("HTTP %s from %s, retrying in %.1fs", status, url, delay)
+            time.sleep(delay)
+            attempt += 1
 
-            response.raise_for_status()
-            return response.json()
+    def _stream_items(self, endpoint: str, prefix: str) -> Iterator[Any]:
+        """
+        Streams the values at an ijson prefix out of a GET response.
+
+        The body is parsed chunk by chunk while it downloads, so only one
+        chunk and the values found so far are held in memory.
+        """
+        parser = _ItemParser(prefix)
+        url = self._urls.get(endpoint) or self._url_prefix + endpoint
+        try:
+            if self.backend == "httpx":
+                with self._get_client().stream("GET", url) as response:
+                    if response.status_code >= 400:
+                        self._check_status(response.status_code, response.read())
+                    for chunk in response.iter_bytes():
+                        yield from parser.feed(chunk)
+            else:
+                with self._get_session().get(
+                    url, stream=True, timeout=self.timeout
+                ) as response:
+                    if response.status_code >= 400:
+                        self._check_status(response.status_code, response.content)
+                    for chunk in response.iter_content(chunk_size=65536):
+                        yield from parser.feed(chunk)
+            yield from parser.close()
 
-        except requests.RequestException as e:
-            logging.error(f"Request failed: {e}")
+        except (*_SYNC_CLIENT_ERRORS, ijson.JSONError) as e:
+            logger.error("Request failed: %s", e)
             raise FireAPIError(f"API request failed: {e}") from e
 
 
 class AsyncFireAPI(BaseFireAPI):
-    """Asynchronous API wrapper for the 24Fire REST API."""
+    """
+    Asynchronous API wrapper for the 24Fire REST API.
+
+    Requests go through aiohttp by default. With ``backend="httpx"`` they use
+    an HTTP/2 ``httpx.AsyncClient`` instead, which multiplexes concurrent
+    requests over a single connection (requires the "http2" extra).
+
+    At most ``concurrency`` requests are in flight at once; further calls
+    wait for a free slot instead of flooding the API into rate limiting.
+    Pass ``concurrency=None`` to remove the cap. With ``max_concurrency`` the
+    cap adapts instead: it starts at ``concurrency``, halves when the API
+    throttles, fails or gets slower than ``latency_target`` seconds on
+    average, and otherwise grows step by step up to ``max_concurrency``.
+    """
+
+    __slots__ = (
+        "backend",
+        "concurrency",
+        "max_concurrency",
+        "latency_target",
+        "_session",
+        "_client",
+        "_inflight",
+        "_limiter",
+    )
+
+    BACKENDS = ("aiohttp", "httpx")
+
+    def __init__(
+        self,
+        api_key: str,
+        timeout: int = 5,
+        cache_ttl: Optional[Dict[str, float]] = None,
+        cache_dir: Optional[str] = None,
+        backend: str = "aiohttp",
+        concurrency: Optional[int] = 8,
+        max_retries: int = 3,
+        backoff_base: float = 0.3,
+        max_backoff: float = 8.0,
+        max_concurrency: Optional[int] = None,
+        latency_target: Optional[float] = None,
+        stale_on_error: bool = False,
+    ):
+        super().__init__(
+            api_key,
+            timeout,
+            cache_ttl,
+            cache_dir,
+            max_retries,
+            backoff_base,
+            max_backoff,
+            stale_on_error,
+        )
+        if concurrency is not None and concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if max_concurrency is not None and (
+            concurrency is None or max_concurrency < concurrency
+        ):
+            raise ValueError("max_concurrency must be at least concurrency")
+        if backend not in self.BACKENDS:
+            raise ValueError(
+                f"Unknown backend {backend!r}, expected one of {self.BACKENDS}"
+            )
+        if backend == "httpx" and httpx is None:
+            raise ImportError(
+                "The httpx backend requires httpx: pip install 'fireapi[http2]'"
+            )
+        self.backend = backend
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        if backend == "aiohttp":
+            # aiohttp parses a string URL on every request; pre-parsed ones
+            # are used as they are.
+            self._urls = {endpoint: URL(url) for endpoint, url in self._urls.items()}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Created on first use, inside the event loop that will wait on it.
+        self._limiter: Optional[_ConcurrencyLimiter] = None
+
+    async def __aenter__(self) -> "AsyncFireAPI":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the shared client session, creating it on first use.
+
+        The session has to be created from within a running event loop, so it
+        cannot be built in ``__init__``. Reusing it keeps connections alive
+        between calls instead of paying a new TCP/TLS handshake every time.
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(
+                    limit=100,
+                    limit_per_host=32,
+                    use_dns_cache=True,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=75,
+                ),
+            )
+        return self._session
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        """Returns the shared HTTP/2 client of the httpx backend, creating it on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                http2=True,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Closes the underlying client session and releases its connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._close_cache()
+        # A client reused under another event loop needs a new limiter.
+        self._limiter = None
 
     async def _request(
-        self, endpoint: str, method: str = "GET", data: Dict = None
+        self,
+        endpoint: str,
+        method: str = "GET",
+        data: Union[Dict, bytes] = None,
+        params: Dict = None,
+        bypass_cache: bool = False,
     ) -> Dict:
-        """Makes an asynchronous API request and handles potential errors."""
-        url = f"{self.base_url}/{endpoint}"
+        """
+        Makes an asynchronous API request and handles potential errors.
+
+        Concurrent GET requests for the same endpoint share a single network
+        round-trip: later callers await the request already in flight. Each
+        caller of a GET gets its own copy of the response, so modifying it
+        doesn't change what the cache hands out.
+        """
+        if method != "GET" or params is not None or data is not None:
+            return await self._fetch(endpoint, method, data, params)
+        if bypass_cache:
+            return _copy_json(await self._fetch(endpoint, method))
+
+        cached = self._get_cached(endpoint)
+        if cached is not None:
+            return _copy_json(cached)
+
+        task = self._inflight.get(endpoint)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_or_stale(endpoint))
+            self._inflight[endpoint] = task
+            task.add_done_callback(lambda t: self._forget_inflight(endpoint, t))
+        # Shielded so a cancelled caller doesn't cancel the shared request.
+        return _copy_json(await asyncio.shield(task))
+
+    async def snapshot(
+        self, *, include: Iterable[str] = ("config", "status")
+    ) -> Dict[str, Union[Dict, BaseException]]:
+        """
+        Fetch several GET endpoints concurrently.
+
+        The requests are sent at the same time over the shared session, so the
+        whole snapshot takes about as long as the slowest single request.
+
+        Args:
+            include (Iterable[str], optional): The endpoints to fetch.
+                Defaults to ("config", "status").
+
+        Usage:
+            >>> snapshot = await fire_api.snapshot(
+            ...     include=("config", "status", "backup/list")
+            ... )
+            >>> print(snapshot["status"]["data"]["status"])
+            >>> # A monitoring dashboard in one round-trip
+            >>> dashboard = await fire_api.snapshot(
+            ...     include=("status", "monitoring/timings", "monitoring/incidences")
+            ... )
+
+        Returns:
+            dict: The response of each endpoint, keyed by endpoint. A request
+            that failed maps to the exception it raised.
+        """
+        include = tuple(include)
+        results = await self.request_many((endpoint,) for endpoint in include)
+        return dict(zip(include, results))
+
+    async def wait_for_status(
+        self, target: str, interval: float = 1.0, timeout: float = 60.0
+    ) -> Dict:
+        """
+        Poll the server status until it reaches ``target``.
+
+        The status is requested every ``interval`` seconds over the shared
+        session, bypassing the cache. While the server is still booting the
+        response rarely changes, so a body identical to the previous one is
+        not parsed again. ``timeout`` bounds the polling; a poll already in
+        progress, including its retries, is finished first.
+
+        Args:
+            target (str): The status to wait for, e.g. "running".
+            interval (float, optional): Seconds between polls. Defaults to 1.0.
+            timeout (float, optional): Seconds to wait at most. Defaults to 60.0.
+
+        Usage:
+            >>> await fire_api.start_server()
+            >>> status = await fire_api.wait_for_status("running")
+
+        Returns:
+            dict: The first status response with the target status.
+
+        Raises:
+            FireAPIError: If the server doesn't reach ``target`` within
+            ``timeout`` seconds, a request fails, or a response has no
+            ``data.status``.
+        """
+        deadline = time.monotonic() + timeout
+        url = self._urls["status"]
+        previous = result = None
+        while True:
+            try:
+                generation = self._cache_generation("status")
+                status, headers, body = await self._send_retrying(
+                    "GET", url, None, None
+                )
+                if status >= 400:
+                    self._check_status(status, body)
+                if body != previous:
+                    result = _json_loads(body)
+                    previous = body
+                current = self._status_of(result, body)
+
+            except (*_ASYNC_CLIENT_ERRORS, ValueError) as e:
+                logger.error("Request failed: %s", e)
+                raise FireAPIError(f"API request failed: {e}") from e
+
+            if current == target:
+                self._update_cache(
+                    "status", "GET", result, headers=headers, generation=generation
+                )
+                return _copy_json(result)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise FireAPIError(
+                    f"Server did not reach status {target!r} within {timeout}s"
+                )
+            await asyncio.sleep(min(interval, remaining))
+
+    async def request_many(
+        self, calls: Iterable[Tuple]
+    ) -> List[Union[Dict, BaseException]]:
+        """
+        Send several requests concurrently over the shared session.
+
+        Args:
+            calls (Iterable[Tuple]): ``(endpoint, method, data, params)``
+                tuples, as passed to ``_request``; all but the endpoint may be
+                left out.
+
+        Usage:
+            >>> config, status = await fire_api.request_many([("config",), ("status",)])
+
+        Returns:
+            list: The response of each call, in order. A call that failed is
+            returned as the exception it raised.
+        """
+        return await asyncio.gather(
+            *(self._request(*call) for call in calls), return_exceptions=True
+        )
+
+    async def fetch_many(
+        self, *calls: Callable[[], Awaitable[Dict]]
+    ) -> List[Union[Dict, BaseException]]:
+        """
+        Call several API methods concurrently.
+
+        Like ``request_many``, but takes the methods themselves, or any other
+        coroutine functions without arguments, so the endpoints don't have to
+        be spelled out.
+
+        Usage:
+            >>> config, status, backups = await fire_api.fetch_many(
+            ...     fire_api.get_config, fire_api.get_status, fire_api.backup_list
+            ... )
+
+        Returns:
+            list: The result of each call, in order. A call that failed is
+            returned as the exception it raised.
+        """
+        return await asyncio.gather(*(call() for call in calls), return_exceptions=True)
+
+    def _invalidate(self, endpoint: Optional[str]) -> None:
+        super()._invalidate(endpoint)
+        # Later callers send a new request instead of joining an outdated one.
+        if endpoint is None:
+            self._inflight.clear()
+        else:
+            self._inflight.pop(endpoint, None)
+
+    def _forget_inflight(self, endpoint: str, task: asyncio.Task) -> None:
+        """Removes a finished request from the in-flight table."""
+        if self._inflight.get(endpoint) is task:
+            del self._inflight[endpoint]
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller went away.
+            task.exception()
+
+    async def _fetch_or_stale(self, endpoint: str) -> Dict:
+        """GETs an endpoint, falling back to its expired cached response on failure."""
         try:
-            async with aiohttp.ClientSession(headers=self.headers) as session:
-                async with session.request(
-                    method, url, json=data, timeout=self.timeout
-                ) as response:
-                    if response.status == 401:
-                        raise APIAuthenticationError(
-                            "Authentication failed. Check your API key."
-                        )
-                    elif response.status == 403:
-                        raise APIAuthenticationError(
-                            "Access denied or this feature requires a '24fire+' subscription."
-                        )
-
-                    response.raise_for_status()
-                    return await response.json()
-
-        except aiohttp.ClientError as e:
-            logging.error(f"Request failed: {e}")
+            return await self._fetch(endpoint, "GET")
+        except FireAPIError as e:
+            stale = self._get_stale(endpoint, e)
+            if stale is None:
+                raise
+            return stale
+
+    async def _fetch(
+        self,
+        endpoint: str,
+        method: str,
+        data: Union[Dict, bytes] = None,
+        params: Dict = None,
+    ) -> Dict:
+        """
+        Sends a request over the shared session and returns the JSON response.
+
+        A GET for an expired cached response that carried an ETag or a
+        Last-Modified date is sent as a conditional request; a 304 answer
+        reuses the cached response.
+        """
+        generation = self._cache_generation(endpoint)
+        validators, cached = self._get_revalidation(endpoint, method, params)
+        url = self._urls.get(endpoint) or self._url_prefix + endpoint
+        try:
+            status, headers, body = await self._send_retrying(
+                method, url, _encode_body(data), params, validators
+            )
+            if status == 304 and cached is not None:
+                self._refresh_cache(endpoint, cached, validators, generation)
+                return cached
+            if status >= 400:
+                self._check_status(status, body)
+            result = _json_loads(body)
+
+        except (*_ASYNC_CLIENT_ERRORS, ValueError) as e:
+            logger.error("Request failed: %s", e)
+            raise FireAPIError(f"API request failed: {e}") from e
+
+        self._update_cache(endpoint, method, result, params, headers, generation)
+        return result
+
+    async def _send_retrying(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        params: Optional[Dict],
+        headers: Optional[Dict] = None,
+    ) -> Tuple[int, Any, bytes]:
+        """
+        Sends a request, retrying it if it is idempotent and fails transiently.
+
+        Requests that failed with a network error or a transient error status
+        are retried with jittered exponential backoff, honouring the
+        Retry-After header, the same way the urllib3 Retry of FireAPI does.
+        """
+        attempt = 0
+        while True:
+            try:
+                response = await self._send(method, url, body, params, headers)
+            except _ASYNC_TRANSIENT_ERRORS as e:
+                if not self._should_retry(method, attempt):
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning("%r from %s, retrying in %.1fs", e, url, delay)
+            else:
+                status, response_headers, _ = response
+                self._note_rate_limit(response_headers)
+                if not self._should_retry(method, attempt, status):
+                    return response
+                delay = self._retry_delay(attempt, response_headers.get("Retry-After"))
+                logger.warning("HTTP %s from %s, retrying in %.1fs", status, url, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        params: Optional[Dict],
+        headers: Optional[Dict] = None,
+    ) -> Tuple[int, Any, bytes]:
+        """Sends one request and returns its status, headers and raw body."""
+        delay = self._rate_limit_delay()
+        if delay:
+            logger.warning("Rate limit reached, waiting %.1fs", delay)
+            await asyncio.sleep(delay)
+        if self.concurrency is None:
+            return await self._send_now(method, url, body, params, headers)
+        if self._limiter is None:
+            self._limiter = _ConcurrencyLimiter(
+                self.concurrency, self.max_concurrency, self.latency_target
+            )
+        limiter = self._limiter
+        await limiter.acquire()
+        started = time.monotonic()
+        try:
+            result = await self._send_now(method, url, body, params, headers)
+        except _ASYNC_TRANSIENT_ERRORS:
+            limiter.release(failed=True, started=started)
+            raise
+        except BaseException:
+            limiter.release()
+            raise
+        if result[0] == 429 or result[0] >= 500:
+            limiter.release(failed=True, started=started)
+        else:
+            limiter.release(time.monotonic() - started)
+        return result
+
+    async def _send_now(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        params: Optional[Dict],
+        headers: Optional[Dict] = None,
+    ) -> Tuple[int, Any, bytes]:
+        if self.backend == "httpx":
+            response = await self._get_client().request(
+                method, url, content=body, params=params, headers=headers
+            )
+            return response.status_code, response.headers, response.content
+        async with self._get_session().request(
+            method, url, data=body, params=params, headers=headers
+        ) as response:
+            return response.status, response.headers, await response.read()
+
+    async def _stream_items(self, endpoint: str, prefix: str) -> AsyncIterator[Any]:
+        """
+        Streams the values at an ijson prefix out of a GET response.
+
+        The body is parsed chunk by chunk while it downloads, so only one
+        chunk and the values found so far are held in memory.
+        """
+        parser = _ItemParser(prefix)
+        url = self._urls.get(endpoint) or self._url_prefix + endpoint
+        try:
+            if self.backend == "httpx":
+                async with self._get_client().stream("GET", url) as response:
+                    if response.status_code >= 400:
+                        self._check_status(response.status_code, await response.aread())
+                    async for chunk in response.aiter_bytes():
+                        for item in parser.feed(chunk):
+                            yield item
+            else:
+                async with self._get_session().get(url) as response:
+                    if response.status >= 400:
+                        self._check_status(response.status, await response.read())
+                    async for chunk in response.content.iter_chunked(65536):
+                        for item in parser.feed(chunk):
+                            yield item
+            for item in parser.close():
+                yield item
+
+        except (*_ASYNC_CLIENT_ERRORS, ijson.JSONError) as e:
+            logger.error("Request failed: %s", e)
             raise FireAPIError(f"API request failed: {e}") from e
+
+
+class Batcher:
+    """
+    Runs many AsyncFireAPI calls concurrently, at most ``concurrency`` at a time.
+
+    Calls submitted to the batcher start right away, sharing the client's
+    session, so a mass operation takes a few round-trips instead of one per
+    call. Leaving the ``async with`` block waits for every call to finish,
+    or cancels them if the block raised.
+
+    Usage:
+        >>> async with AsyncFireAPI(API_KEY) as api, Batcher(concurrency=16) as batch:
+        ...     for backup_id in backup_ids:
+        ...         batch.submit(api.backup_delete, backup_id)
+        ...     results = await batch.gather()
+    """
+
+    __slots__ = ("_semaphore", "_tasks")
+
+    def __init__(self, concurrency: int = 16):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: List[asyncio.Task] = []
+
+    async def __aenter__(self) -> "Batcher":
+        return self
+
+    async def __aexit__(self, exc_type, *exc_info) -> None:
+        if exc_type is not None:
+            for task in self._tasks:
+                task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def submit(self, fn: Callable[..., Awaitable], *args, **kwargs) -> asyncio.Task:
+        """
+        Schedules ``fn(*args, **kwargs)`` and returns the task running it.
+
+        The coroutine is only created once a slot is free, so queued calls
+        hold no resources.
+        """
+        task = asyncio.ensure_future(self._run(fn, args, kwargs))
+        self._tasks.append(task)
+        return task
+
+    async def gather(self) -> List[Union[Any, BaseException]]:
+        """
+        Waits for every submitted call.
+
+        Returns:
+            list: The result of each call, in submission order. A call that
+            failed is returned as the exception it raised.
+        """
+        return await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def as_completed(self) -> AsyncIterator[Union[Any, BaseException]]:
+        """
+        Yields the result of each submitted call as soon as it finishes.
+
+        A call that failed or was cancelled is yielded as its exception, the
+        way ``gather`` returns it; cancelling the iteration itself still
+        raises.
+        """
+        pending = set(self._tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.cancelled():
+                    yield asyncio.CancelledError()
+                elif task.exception() is not None:
+                    yield task.exception()
+                else:
+                    yield task.result()
+
+    async def _run(self, fn: Callable[..., Awaitable], args: Tuple, kwargs: Dict):
+        async with self._semaphore:
+            return await fn(*args, **kwargs)
@@ -1,28 +1,445 @@
 """This module contains the abstract base class for FireAPI."""
 
+import email.utils
+import hashlib
+import logging
+import os
+import random
+import time
 from abc import ABC, abstractmethod
-from typing import Dict
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .exceptions import APIAuthenticationError, APIRequestError, FireAPIError
+
+try:
+    import diskcache
+except ImportError:  # optional, installed with the "cache" extra
+    diskcache = None
+
+logger = logging.getLogger(__name__)
+
+
+def _copy_json(value: Any) -> Any:
+    """
+    Copies a decoded JSON value, so a caller can modify its copy without
+    changing the cached response. Faster than copy.deepcopy, which would also
+    handle types JSON never produces.
+    """
+    if isinstance(value, dict):
+        return {key: _copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    return value
 
 
 class BaseFireAPI(ABC):
     """Abstract base class for FireAPI."""
 
-    def __init__(self, api_key: str, timeout: int = 5):
-        """Initializes a new FireAPI instance."""
+    __slots__ = (
+        "api_key",
+        "base_url",
+        "headers",
+        "timeout",
+        "max_retries",
+        "backoff_base",
+        "max_backoff",
+        "stale_on_error",
+        "_url_prefix",
+        "_urls",
+        "_cache_ttl",
+        "_cache",
+        "_clock",
+        "_generations",
+        "_pause_until",
+    )
+
+    # Endpoints with a fixed URL; the full URLs are built once per client.
+    _ENDPOINTS = (
+        "config",
+        "status",
+        "status/start",
+        "status/stop",
+        "status/restart",
+        "backup/create",
+        "backup/delete",
+        "backup/list",
+        "monitoring/timings",
+        "monitoring/incidences",
+    )
+
+    # Seconds a GET response stays cached, per endpoint.
+    CACHE_TTL = {
+        "config": 60.0,
+        "status": 2.0,
+        "backup/list": 60.0,
+        "monitoring/timings": 30.0,
+        "monitoring/incidences": 30.0,
+    }
+
+    # Cached endpoints made stale by a successful request to an endpoint.
+    _CACHE_INVALIDATIONS = {
+        "status/start": ("status",),
+        "status/stop": ("status",),
+        "status/restart": ("status",),
+        "backup/create": ("backup/list",),
+        "backup/delete": ("backup/list",),
+    }
+
+    # Exception and message _check_status raises for status codes with a
+    # known meaning. It only runs for error responses, so a dict lookup is
+    # all this needs.
+    _STATUS_ERRORS = {
+        401: (APIAuthenticationError, "Authentication failed. Check your API key."),
+        403: (
+            APIAuthenticationError,
+            "Access denied or this feature requires a '24fire+' subscription.",
+        ),
+    }
+
+    # Response headers identifying a version of a response, and the request
+    # headers that ask the API to answer 304 if it is still current.
+    _VALIDATORS = (
+        ("ETag", "If-None-Match"),
+        ("Last-Modified", "If-Modified-Since"),
+    )
+
+    # Requests left in the rate-limit window at which a client pauses until
+    # the window resets, instead of running into 429 responses.
+    _RATE_LIMIT_RESERVE = 2
+
+    # Retry policy for transient failures. POST is left out because
+    # repeating backup/create would create a second backup.
+    _RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+    _RETRY_METHODS = frozenset(("GET", "DELETE"))
+    # Upper bound of the random jitter added to each backoff, in seconds, so
+    # clients that failed together don't retry in lockstep.
+    _RETRY_JITTER = 0.2
+    # Longest wait in seconds, unless max_backoff is longer, that a
+    # Retry-After or X-RateLimit-Reset header can impose on a single call.
+    _MAX_SERVER_WAIT = 60.0
+
+    def __init__(
+        self,
+        api_key: str,
+        timeout: int = 5,
+        cache_ttl: Optional[Dict[str, float]] = None,
+        cache_dir: Optional[str] = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.3,
+        max_backoff: float = 8.0,
+        stale_on_error: bool = False,
+    ):
+        """
+        Initializes a new FireAPI instance.
+
+        Args:
+            api_key (str): The private 24Fire API key.
+            timeout (int, optional): Request timeout in seconds. Defaults to 5.
+            cache_ttl (Dict[str, float], optional): Seconds to cache GET responses,
+                per endpoint. Defaults to CACHE_TTL; pass {} to disable caching.
+            cache_dir (str, optional): Directory to keep the response cache in,
+                so it is shared between processes and survives restarts.
+                Requires diskcache. Responses are stored unencrypted, and the
+                config response includes the server's root password. Defaults
+                to None, which keeps the cache in memory.
+            max_retries (int, optional): How often an idempotent request that
+                failed with a network error, 429 or 5xx status is retried.
+                Defaults to 3.
+            backoff_base (float, optional): Seconds to wait before the first
+                retry; the wait doubles with every further retry. Defaults
+                to 0.3.
+            max_backoff (float, optional): Upper bound of the wait between
+                retries, unless the API asks for longer with Retry-After.
+                Defaults to 8.0.
+            stale_on_error (bool, optional): Return the last cached response,
+                however old, when refreshing it fails with a network error or
+                a 5xx status, instead of raising. Authentication and other
+                4xx errors are always raised. Defaults to False.
+        """
         self.api_key = api_key
         self.base_url = "https://api.24fire.de/kvm"
-        self.headers = {"X-FIRE-APIKEY": api_key}
+        # Read-only, so the sessions built from it can share it safely. Bodies
+        # are always JSON, so the content type is set once for every request.
+        self.headers = MappingProxyType(
+            {"X-FIRE-APIKEY": api_key, "Content-Type": "application/json"}
+        )
         self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.stale_on_error = stale_on_error
+        self._url_prefix = self.base_url.rstrip("/") + "/"
+        self._urls = {
+            endpoint: self._url_prefix + endpoint for endpoint in self._ENDPOINTS
+        }
+        self._cache_ttl = dict(self.CACHE_TTL if cache_ttl is None else cache_ttl)
+        if cache_dir is None:
+            self._cache: Dict[str, Tuple[float, Dict, Optional[Dict]]] = {}
+            self._clock = time.monotonic
+        else:
+            if diskcache is None:
+                raise ImportError(
+                    "cache_dir requires diskcache: pip install 'fireapi[cache]'"
+                )
+            # One directory per API key, named by its hash, so clients with
+            # different keys never see each other's responses.
+            key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+            self._cache = diskcache.Cache(
+                os.path.join(os.path.expanduser(cache_dir), key_hash)
+            )
+            # Entries outlive the process, so they need wall-clock timestamps.
+            self._clock = time.time
+        # Bumped whenever an endpoint's cached response is invalidated, with
+        # None counting invalidations of the whole cache, so a GET that was
+        # already in flight doesn't store its outdated response afterwards.
+        self._generations: Dict[Optional[str], int] = {}
+        self._pause_until = 0.0
 
     @abstractmethod
-    def _request(self, endpoint: str, method: str = "GET", data: Dict = None) -> Dict:
+    def _request(
+        self,
+        endpoint: str,
+        method: str = "GET",
+        data: Union[Dict, bytes] = None,
+        params: Dict = None,
+        bypass_cache: bool = False,
+    ) -> Dict:
         """Abstract method for making API requests."""
         pass
 
-    def get_config(self) -> Dict:
+    @abstractmethod
+    def request_many(self, calls: Iterable[Tuple]) -> List:
+        """Abstract method for sending several API requests concurrently."""
+        pass
+
+    @abstractmethod
+    def _stream_items(self, endpoint: str, prefix: str) -> Iterator[Any]:
+        """Abstract method for streaming the values at a prefix out of a response."""
+        pass
+
+    def _should_retry(self, method: str, attempt: int, status: int = None) -> bool:
+        """
+        Returns whether attempt number ``attempt`` of a request should be repeated.
+
+        ``status`` is None when the attempt failed with a network error.
+        """
+        return (
+            method in self._RETRY_METHODS
+            and attempt < self.max_retries
+            and (status is None or status in self._RETRY_STATUSES)
+        )
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Returns the seconds to wait before retry number ``attempt + 1``.
+
+        A Retry-After header, given in seconds or as an HTTP date, takes
+        precedence over the jittered exponential backoff, up to
+        ``_server_wait_cap()`` seconds.
+        """
+        if retry_after:
+            try:
+                wait = float(retry_after)
+            except ValueError:
+                try:
+                    when = email.utils.parsedate_to_datetime(retry_after)
+                    wait = when.timestamp() - time.time()
+                except (TypeError, ValueError):
+                    wait = None
+            if wait is not None:
+                return min(max(0.0, wait), self._server_wait_cap())
+        backoff = min(self.max_backoff, self.backoff_base * 2**attempt)
+        return backoff + random.uniform(0, self._RETRY_JITTER)
+
+    def _server_wait_cap(self) -> float:
+        """Returns the longest wait the API's headers can impose, in seconds."""
+        return max(self.max_backoff, self._MAX_SERVER_WAIT)
+
+    @staticmethod
+    def _status_of(result: Any, body: bytes) -> str:
+        """Returns ``data.status`` of a status response, or raises FireAPIError."""
+        data = result.get("data") if isinstance(result, dict) else None
+        status = data.get("status") if isinstance(data, dict) else None
+        if not isinstance(status, str):
+            detail = body[:200].decode(errors="replace")
+            raise FireAPIError(f"Unexpected status response: {detail}")
+        return status
+
+    def _check_status(self, status: int, body: bytes) -> None:
+        """
+        Raises the exception for an error response.
+
+        Status codes listed in _STATUS_ERRORS raise their registered exception.
+        Any other client error raises APIRequestError and a server error raises
+        FireAPIError, both with the start of the response body.
+        """
+        error = self._STATUS_ERRORS.get(status)
+        if error is not None:
+            raise error[0](error[1])
+        detail = body[:200].decode(errors="replace")
+        logger.error("Request failed with HTTP %s: %s", status, detail)
+        exc_class = APIRequestError if status < 500 else FireAPIError
+        raise exc_class(f"API request failed with HTTP {status}: {detail}")
+
+    def _note_rate_limit(self, headers: Any) -> None:
+        """
+        Reads the rate-limit headers of a response.
+
+        When the window is (nearly) used up, further requests are held back
+        until X-RateLimit-Reset, which may be a Unix timestamp or a number of
+        seconds from now, but for no longer than ``_server_wait_cap()``.
+        """
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            if int(remaining) > self._RATE_LIMIT_RESERVE:
+                return
+            reset = float(reset)
+        except ValueError:
+            return
+        wait = reset - time.time() if reset > 1e9 else reset
+        wait = min(wait, self._server_wait_cap())
+        if wait > 0:
+            self._pause_until = max(self._pause_until, time.monotonic() + wait)
+
+    def _rate_limit_delay(self) -> float:
+        """Returns the seconds to wait before the rate limit allows a request."""
+        return max(0.0, self._pause_until - time.monotonic())
+
+    def _get_cached(self, endpoint: str) -> Optional[Dict]:
+        """Returns the cached response for an endpoint if it is still fresh."""
+        ttl = self._cache_ttl.get(endpoint)
+        entry = self._cache.get(endpoint)
+        if ttl and entry and self._clock() - entry[0] < ttl:
+            return entry[1]
+        return None
+
+    def _get_revalidation(
+        self, endpoint: str, method: str, params: Dict = None
+    ) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """
+        Returns the conditional request headers for a cached response, and the
+        response itself, or (None, None) if there is nothing to revalidate.
+
+        A stale entry is kept until it is replaced, so its ETag and
+        Last-Modified date can still be sent with If-None-Match and
+        If-Modified-Since, and a 304 answer reuses the parsed response.
+        """
+        if method != "GET" or params is not None:
+            return None, None
+        entry = self._cache.get(endpoint)
+        if entry is None or entry[2] is None:
+            return None, None
+        return entry[2], entry[1]
+
+    def _cache_generation(self, endpoint: str) -> Tuple[int, int]:
+        """
+        Returns how often the cached response for an endpoint has been
+        invalidated, to be passed back when storing a GET response.
+        """
+        return self._generations.get(None, 0), self._generations.get(endpoint, 0)
+
+    def _refresh_cache(
+        self,
+        endpoint: str,
+        result: Dict,
+        validators: Dict,
+        generation: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """Marks a cached response the server reported unchanged as fresh again."""
+        if generation is None or generation == self._cache_generation(endpoint):
+            self._cache[endpoint] = (self._clock(), result, validators)
+
+    def _get_stale(self, endpoint: str, error: FireAPIError) -> Optional[Dict]:
+        """
+        Returns the expired cached response to serve instead of raising
+        ``error``, or None if there is none or stale_on_error is off.
+        """
+        if not self.stale_on_error or isinstance(
+            error, (APIAuthenticationError, APIRequestError)
+        ):
+            return None
+        entry = self._cache.get(endpoint)
+        if entry is None:
+            return None
+        logger.warning("Serving a stale %s response after: %s", endpoint, error)
+        return entry[1]
+
+    def _update_cache(
+        self,
+        endpoint: str,
+        method: str,
+        result: Dict,
+        params: Dict = None,
+        headers: Any = None,
+        generation: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """
+        Stores a GET response or drops the entries a mutating call made stale.
+
+        ``headers`` are the response headers; an ETag or Last-Modified date
+        among them is kept with the response to revalidate it once it expires.
+        ``generation`` is the ``_cache_generation`` from when the GET was
+        sent; if the endpoint has been invalidated since, the response is not
+        stored.
+        """
+        if method == "GET":
+            if generation is not None and generation != self._cache_generation(
+                endpoint
+            ):
+                return
+            # Only plain endpoint responses are cached, not parameterized ones.
+            if params is None and self._cache_ttl.get(endpoint):
+                validators = {}
+                if headers is not None:
+                    for response_header, request_header in self._VALIDATORS:
+                        value = headers.get(response_header)
+                        if value:
+                            validators[request_header] = value
+                self._cache[endpoint] = (self._clock(), result, validators or None)
+        else:
+            for stale in self._CACHE_INVALIDATIONS.get(endpoint, ()):
+                self._invalidate(stale)
+
+    def clear_cache(self, endpoint: Optional[str] = None) -> None:
+        """
+        Drops cached responses.
+
+        Args:
+            endpoint (str, optional): Only drop the response cached for this
+                endpoint, e.g. "backup/list". Defaults to None, which drops
+                all cached responses.
+        """
+        self._invalidate(endpoint)
+
+    def _invalidate(self, endpoint: Optional[str]) -> None:
+        """
+        Drops the cached response for an endpoint, or all of them for None,
+        and keeps GETs already in flight from storing theirs.
+        """
+        self._generations[endpoint] = self._generations.get(endpoint, 0) + 1
+        if endpoint is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(endpoint, None)
+
+    def _close_cache(self) -> None:
+        """Closes the database connection of an on-disk cache."""
+        if diskcache is not None and isinstance(self._cache, diskcache.Cache):
+            # diskcache reopens the connection if the cache is used again.
+            self._cache.close()
+
+    def get_config(self, bypass_cache: bool = False) -> Dict:
         """
         Retrieve the server configuration as a JSON object.
 
+        Args:
+            bypass_cache (bool, optional): Fetch a fresh response from the API
+                instead of returning the cached one. Defaults to False.
+
         Usage:
             >>> config = fire_api.get_config()
             >>> print(config['data']['hostsystem']['processor'])
@@ -80,12 +497,16 @@ class BaseFireAPI(ABC):
             }
         }
         """
-        return self._request("config")
+        return self._request("config", bypass_cache=bypass_cache)
 
-    def get_status(self) -> Dict:
+    def get_status(self, bypass_cache: bool = False) -> Dict:
         """
         Retrieve the server status as a JSON object.
 
+        Args:
+            bypass_cache (bool, optional): Fetch a fresh response from the API
+                instead of returning the cached one. Defaults to False.
+
         Usage:
             >>> status = fire_api.get_status()
             >>> print(status)
@@ -119,7 +540,31 @@ class BaseFireAPI(ABC):
             }
         }
         """
-        return self._request("status")
+        return self._request("status", bypass_cache=bypass_cache)
+
+    def iter_config_field(self, prefix: str) -> Iterator[Any]:
+        """
+        Stream the values at a path of the server configuration.
+
+        The response is parsed while it downloads instead of being read into
+        memory first, which helps when only a small part of it is needed.
+        Requires the optional ijson dependency (the "stream" extra).
+
+        Args:
+            prefix (str): The ijson prefix of the values, e.g.
+                "data.hostsystem.processor" or "data.config.ipv4.item".
+
+        Usage:
+            >>> for processor in fire_api.iter_config_field("data.hostsystem.processor"):
+            ...     print(processor)
+            >>> # AsyncFireAPI returns an async iterator
+            >>> async for ip in async_fire_api.iter_config_field("data.config.ipv4.item"):
+            ...     print(ip["ip_address"])
+
+        Returns:
+            Iterator: The matching values, in document order.
+        """
+        return self._stream_items("config", prefix)
 
     def start_server(self) -> Dict:
         """
@@ -208,7 +653,37 @@ class BaseFireAPI(ABC):
             "data": null
         }
         """
-        return self._request(f"backup/delete?backup_id={backup_id}", method="DELETE")
+        return self._request(
+            "backup/delete", method="DELETE", params={"backup_id": backup_id}
+        )
+
+    def backup_delete_many(self, backup_ids: Iterable[str]) -> List:
+        """
+        Delete several backups concurrently.
+
+        The deletions are sent at the same time through request_many(), so
+        deleting N backups takes about one round-trip instead of N.
+
+        Note: This operation is exclusive to '24fire+' subscribers.
+
+        Args:
+            backup_ids (Iterable[str]): The IDs of the backups to delete.
+
+        Usage:
+            >>> responses = fire_api.backup_delete_many(["backup_id", "other_id"])
+            >>> # AsyncFireAPI returns a coroutine
+            >>> responses = await async_fire_api.backup_delete_many(["backup_id"])
+
+        Returns:
+            list: The response for each backup, in order. A deletion that
+            failed is returned as the exception it raised.
+        """
+        return self.request_many(
+            [
+                ("backup/delete", "DELETE", None, {"backup_id": backup_id})
+                for backup_id in backup_ids
+            ]
+        )
 
     def backup_create(self, description: str) -> Dict:
         """
@@ -240,12 +715,16 @@ class BaseFireAPI(ABC):
             "backup/create", method="POST", data={"description": description}
         )
 
-    def backup_list(self) -> Dict:
+    def backup_list(self, bypass_cache: bool = False) -> Dict:
         """
         List all backups.
 
         Note: This operation is exclusive to '24fire+' subscribers.
 
+        Args:
+            bypass_cache (bool, optional): Fetch a fresh response from the API
+                instead of returning the cached one. Defaults to False.
+
         Usage:
             >>> backups = fire_api.backup_list()
             >>> print(backups)
@@ -278,14 +757,41 @@ class BaseFireAPI(ABC):
             ]
         }
         """
-        return self._request("backup/list")
+        return self._request("backup/list", bypass_cache=bypass_cache)
 
-    def timings(self) -> Dict:
+    def iter_backups(self) -> Iterator[Dict]:
+        """
+        Stream the backups one at a time.
+
+        Like backup_list(), but the response is parsed while it downloads
+        and each backup is yielded as soon as it is complete, so the whole
+        list is never held in memory. Requires the optional ijson dependency
+        (the "stream" extra).
+
+        Note: This operation is exclusive to '24fire+' subscribers.
+
+        Usage:
+            >>> for backup in fire_api.iter_backups():
+            ...     print(backup["backup_id"], backup["status"])
+            >>> # AsyncFireAPI returns an async iterator
+            >>> async for backup in async_fire_api.iter_backups():
+            ...     print(backup["backup_id"])
+
+        Returns:
+            Iterator[dict]: The backups, in the order the API lists them.
+        """
+        return self._stream_items("backup/list", "data.item")
+
+    def timings(self, bypass_cache: bool = False) -> Dict:
         """
         Retrieve monitoring timings.
 
         Note: This operation is exclusive to '24fire+' subscribers.
 
+        Args:
+            bypass_cache (bool, optional): Fetch a fresh response from the API
+                instead of returning the cached one. Defaults to False.
+
         Usage:
             >>> timings = fire_api.timings()
             >>> print(timings)
@@ -316,14 +822,18 @@ class BaseFireAPI(ABC):
             }
         }
         """
-        return self._request("monitoring/timings")
+        return self._request("monitoring/timings", bypass_cache=bypass_cache)
 
-    def incidences(self) -> Dict:
+    def incidences(self, bypass_cache: bool = False) -> Dict:
         """
         Retrieve monitoring incidences.
 
         Note: This operation is exclusive to '24fire+' subscribers.
 
+        Args:
+            bypass_cache (bool, optional): Fetch a fresh response from the API
+                instead of returning the cached one. Defaults to False.
+
         Usage:
             >>> incidences = fire_api.incidences()
             >>> print(incidences)
@@ -422,4 +932,26 @@ class BaseFireAPI(ABC):
             }
         }
         """
-        return self._request("monitoring/incidences")
+        return self._request("monitoring/incidences", bypass_cache=bypass_cache)
+
+    def iter_incidences(self) -> Iterator[Dict]:
+        """
+        Stream the monitoring incidences one at a time.
+
+        Like incidences(), but only the incidence list is returned, parsed
+        while the response downloads, so a long history is never held in
+        memory. Requires the optional ijson dependency (the "stream" extra).
+
+        Note: This operation is exclusive to '24fire+' subscribers.
+
+        Usage:
+            >>> for incidence in fire_api.iter_incidences():
+            ...     print(incidence["type"], incidence["downtime"])
+            >>> # AsyncFireAPI returns an async iterator
+            >>> async for incidence in async_fire_api.iter_incidences():
+            ...     print(incidence["type"])
+
+        Returns:
+            Iterator[dict]: The incidences, in the order the API lists them.
+        """
+        return self._stream_items("monitoring/incidences", "data.incidences.item")